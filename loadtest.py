@@ -0,0 +1,252 @@
+"""Нагрузочный тест обработчика кнопок на поддельном сервере Telegram Bot API.
+
+Пример запуска:
+    python loadtest.py --rate 50 --duration 20 --chats 200 --types today,week
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any
+
+import pandas as pd
+from aiohttp import web
+
+FAKE_TOKEN = "123456:LOADTEST"
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Расписание", "username": "loadtest_bot"}
+
+# main читает токен при импорте, поэтому подставляем поддельный до импорта
+os.environ.setdefault("BOT_TOKEN", FAKE_TOKEN)
+
+import main  # noqa: E402
+from aiogram import Bot  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.types import Update  # noqa: E402
+
+CALLBACK_TYPES = ["today", "week", "html", "json", "ics", "back", "update"]
+
+# Строки группы для нажатий "update": настоящий сайт колледжа под нагрузкой не трогаем
+FIXTURE_ROWS = [
+    ["№", "Время", "Понедельник 20.10.2025", "Вторник 21.10.2025", "Среда 22.10.2025",
+     "Четверг 23.10.2025", "Пятница 24.10.2025"],
+    [" ", " ", "Дисциплина, вид занятия, преподаватель", " ", " ", " ", " "],
+    [1, "08.00-09.30", "Математика, лекция\nИванов И.И. аудитория 305", " ", " ", " ", " "],
+    [2, "09.40-11.10", " ", "Физика, практика\nПетров П.П. аудитория 210", " ", " ", " "],
+]
+
+class FakeBotAPI:
+    """Минимальная замена Bot API: отвечает правдоподобными объектами и считает вызовы"""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self.updates: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self.answered: dict[str, float] = {}
+        self.message_ids = itertools.count(1000)
+        self.file_ids = itertools.count(1)
+
+    def _message(self, data: Any, **extra: Any) -> dict[str, Any]:
+        chat_id = int(data.get("chat_id", 0) or 0)
+        return {
+            "message_id": int(data.get("message_id") or next(self.message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            **extra,
+        }
+
+    def _file(self) -> dict[str, Any]:
+        n = next(self.file_ids)
+        return {"file_id": f"file-{n}", "file_unique_id": f"uniq-{n}"}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        data = await request.post()
+
+        if method == "getUpdates":
+            return web.json_response({"ok": True, "result": await self._get_updates(data)})
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            result: Any = BOT_USER
+        elif method in ("sendMessage", "editMessageText"):
+            result = self._message(data, text=data.get("text", ""))
+        elif method == "sendPhoto":
+            result = self._message(data, photo=[{**self._file(), "width": 680, "height": 740}])
+        elif method == "sendDocument":
+            result = self._message(data, document=self._file())
+        elif method == "answerCallbackQuery":
+            self.answered[data["callback_query_id"]] = time.perf_counter()
+            result = True
+        else:
+            # deleteMessage, pinChatMessage, deleteWebhook и прочее
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_updates(self, data: Any) -> list[dict[str, Any]]:
+        timeout = float(data.get("timeout", 0) or 0)
+        try:
+            first = await asyncio.wait_for(self.updates.get(), timeout=max(timeout, 0.1))
+        except asyncio.TimeoutError:
+            return []
+        batch = [first]
+        while not self.updates.empty() and len(batch) < 100:
+            batch.append(self.updates.get_nowait())
+        return batch
+
+    async def start(self, port: int) -> tuple[web.AppRunner, int]:
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", port)
+        await site.start()
+        return runner, site._server.sockets[0].getsockname()[1]
+
+def make_update(update_id: int, chat_id: int, data: str) -> dict[str, Any]:
+    """Синтетическое нажатие inline-кнопки под сообщением бота"""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Студент"},
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "Привет! Я бот для расписания ИСП-11.",
+            },
+        },
+    }
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+async def seed_content() -> None:
+    """Как после нажатия "update": страницы и выгрузки из FIXTURE_ROWS в кэше"""
+    df = pd.DataFrame(FIXTURE_ROWS)
+    model = main.build_schedule_model(df, main.GROUP_NAME)
+    main.schedule_models[main.GROUP_NAME] = model
+    for fmt in main.EXPORT_FORMATS:
+        main.store_content(main.GROUP_NAME, f"schedule.{fmt}", main.build_export(model, fmt))
+    await main.convert_to_html_and_save(df)
+    await main.create_day_html(df)
+
+async def run(args: argparse.Namespace) -> None:
+    # Обработчики пишут xls/json/html в текущий каталог: работаем во временном,
+    # чтобы не перезаписать файлы настоящего бота
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="isp-loadtest-") as workdir:
+        os.chdir(workdir)
+        try:
+            await run_load(args)
+        finally:
+            os.chdir(cwd)
+
+async def run_load(args: argparse.Namespace) -> None:
+    api = FakeBotAPI(args.api_latency_ms / 1000)
+    runner, port = await api.start(args.port)
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}"))
+    main.bot = Bot(token=os.environ["BOT_TOKEN"], session=session)
+    await seed_content()
+
+    async def fake_refresh_sources() -> list[str]:
+        # Вместо скачивания — задержка как у поддельного API и готовые строки группы
+        await asyncio.sleep(api.latency)
+        main.group_index[main.GROUP_NAME] = {"source": "loadtest", "rows": FIXTURE_ROWS}
+        return []
+
+    main.refresh_sources = fake_refresh_sources
+
+    polling = None
+    if args.mode == "polling":
+        polling = asyncio.create_task(main.dp.start_polling(main.bot, handle_signals=False, polling_timeout=1))
+
+    types = args.types.split(",")
+    sent: dict[str, tuple[str, float]] = {}
+    feed_tasks: list[asyncio.Task] = []
+    print(f"Поддельный Bot API на порту {port}, режим {args.mode}: "
+          f"{args.rate}/с в течение {args.duration} с, {args.chats} чатов, кнопки {', '.join(types)}")
+
+    started = time.perf_counter()
+    for update_id in range(1, int(args.rate * args.duration) + 1):
+        # Открытая модель нагрузки: нажатия приходят по расписанию, не дожидаясь ответов
+        delay = started + (update_id - 1) / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        data = random.choice(types)
+        update = make_update(update_id, random.randint(1, args.chats), data)
+        sent[str(update_id)] = (data, time.perf_counter())
+        if polling is None:
+            feed_tasks.append(asyncio.create_task(
+                main.dp.feed_update(main.bot, Update.model_validate(update, context={"bot": main.bot}))))
+        else:
+            api.updates.put_nowait(update)
+
+    # Ждем, пока все нажатия получат answerCallbackQuery, но не дольше таймаута
+    deadline = time.perf_counter() + args.drain_timeout
+    while len(api.answered) < len(sent) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = max(api.answered.values(), default=time.perf_counter()) - started
+
+    if polling is not None:
+        await main.dp.stop_polling()
+        await polling
+    for task in feed_tasks:
+        task.cancel()
+    await main.bot.session.close()
+    await runner.cleanup()
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    for callback_id, (data, sent_at) in sent.items():
+        if callback_id in api.answered:
+            latencies[data].append((api.answered[callback_id] - sent_at) * 1000)
+
+    print(f"\n{'кнопка':<8} {'отправлено':>10} {'ответов':>8} {'rps':>8} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    sent_counts = Counter(data for data, _ in sent.values())
+    for data in types:
+        values = latencies[data]
+        if values:
+            print(f"{data:<8} {sent_counts[data]:>10} {len(values):>8} {len(values) / elapsed:>8.1f} "
+                  f"{percentile(values, 50):>9.1f} {percentile(values, 95):>9.1f} {percentile(values, 99):>9.1f}")
+        else:
+            print(f"{data:<8} {sent_counts[data]:>10} {0:>8} {'-':>8} {'-':>9} {'-':>9} {'-':>9}")
+    answered = sum(len(values) for values in latencies.values())
+    print(f"\nВсего: {answered}/{len(sent)} ответов за {elapsed:.1f} с ({answered / elapsed:.1f} rps)")
+    print("Вызовы Bot API: " + ", ".join(f"{method}={count}" for method, count in api.calls.most_common()))
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест handle_callback на поддельном Bot API")
+    parser.add_argument("--rate", type=float, default=20.0, help="нажатий в секунду")
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность подачи нагрузки, с")
+    parser.add_argument("--chats", type=int, default=50, help="число разных чатов")
+    parser.add_argument("--types", default="today,week",
+                        help=f"кнопки через запятую из: {','.join(CALLBACK_TYPES)}")
+    parser.add_argument("--api-latency-ms", type=float, default=50.0, help="задержка ответа поддельного API")
+    parser.add_argument("--mode", choices=["feed", "polling"], default="feed",
+                        help="feed — сразу в Dispatcher, polling — через getUpdates")
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="сколько ждать последних ответов, с")
+    parser.add_argument("--port", type=int, default=0, help="порт поддельного API (0 — любой свободный)")
+    args = parser.parse_args()
+    unknown = set(args.types.split(",")) - set(CALLBACK_TYPES)
+    if unknown:
+        parser.error(f"неизвестные кнопки: {', '.join(sorted(unknown))}")
+    return args
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
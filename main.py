@@ -1,28 +1,105 @@
 from __future__ import annotations
 
 import asyncio
+import base64
+import contextlib
+import gzip
+import hashlib
+import json
+import multiprocessing
 import os
 import re
-from datetime import datetime, timedelta
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Hashable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from html import escape
 from typing import Any
 
 import httpx
 import pandas as pd
+from aiohttp import ClientSession, web
 from aiogram import Bot, Dispatcher, types
 from aiogram.filters import Command
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from html2image import Html2Image
+from html2image.browsers.search_utils import find_chrome
 import io
 from PIL import Image
 
 TABLE_URL = "https://ppk.sstu.ru/doc/rasp/Горького,%209/stud.xls"
 RESULT_FILE = "ИСП-11.xls"
-TEMP_FILE = "temp.xls"
 HTML_FILE = "ИСП-11.html"
 DAY_HTML_FILE = "day_ИСП-11.html"
+JSON_FILE = "ИСП-11.json"
+GROUP_NAME = "ИСП-11"
 
-bot = Bot(token='----------------------------')
+SARATOV_TZ = timezone(timedelta(hours=4))
+TIME_SLOT_RE = re.compile(r'(\d{1,2})[.:](\d{2})\s*-\s*(\d{1,2})[.:](\d{2})')
+DATE_RE = re.compile(r'(\d{2}\.\d{2}\.\d{4})')
+GROUP_RE = re.compile(r'Группа\s*-\s*([^\s,;]+)')
+
+# Файлы расписания по корпусам: SCHEDULE_SOURCES='[{"name": "...", "url": "..."}, ...]'
+SCHEDULE_SOURCES: list[dict[str, str]] = json.loads(os.getenv('SCHEDULE_SOURCES', 'null')) or [
+    {'name': "Горького, 9", 'url': TABLE_URL},
+]
+FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', '4'))
+SOURCE_TIMEOUT = float(os.getenv('SOURCE_TIMEOUT', '30'))
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Состояние каждого источника (валидаторы, ошибки, группы) и общий индекс групп
+source_state: dict[str, dict[str, Any]] = {}
+group_index: dict[str, dict[str, Any]] = {}
+parse_executor: ProcessPoolExecutor | None = None
+
+# Разобранные расписания по группам и готовые выгрузки по (группа, версия, формат)
+schedule_models: dict[str, dict[str, Any]] = {}
+export_cache: dict[tuple[str, str, str], bytes] = {}
+export_file_ids: dict[tuple[str, str, str], str] = {}
+
+# Готовые страницы, картинки и выгрузки по (группа, имя) — общий кэш бота и HTTP API
+content_cache: dict[tuple[str, str], dict[str, Any]] = {}
+CONTENT_TYPES = {
+    'week.html': 'text/html; charset=utf-8',
+    'day.html': 'text/html; charset=utf-8',
+    'week.png': 'image/png',
+    'day.png': 'image/png',
+    'schedule.json': 'application/json; charset=utf-8',
+    'schedule.ics': 'text/calendar; charset=utf-8',
+}
+# Картинки, которые устаревают при обновлении соответствующей страницы
+RENDERED_FROM = {'week.html': 'week.png', 'day.html': 'day.png'}
+render_locks: dict[tuple[str, str], asyncio.Lock] = {}
+# Картинка: (исходная страница, размер окна, высота после обрезки)
+IMAGE_SPECS = {
+    'week.png': ('week.html', (1380, 1110), 920),
+    'day.png': ('day.html', (680, 1040), 740),
+}
+# Файлы, в которые сохраняются страницы
+PAGE_FILES = {'week.html': HTML_FILE, 'day.html': DAY_HTML_FILE}
+RENDER_TABS = int(os.getenv('RENDER_TABS', '4'))
+background_tasks: set[asyncio.Task] = set()
+
+HTTP_API_HOST = os.getenv('HTTP_API_HOST', '127.0.0.1')
+HTTP_API_PORT = int(os.getenv('HTTP_API_PORT', '0'))
+
+# MEMORY_PROFILE=1 включает tracemalloc-снимки на каждом цикле обновления/рендера и /memtop,
+# BOUNDED_MEMORY=1 ограничивает кэши и не держит в памяти разобранные строки чужих групп
+MEMORY_PROFILE = os.getenv('MEMORY_PROFILE') == '1'
+BOUNDED_MEMORY = os.getenv('BOUNDED_MEMORY') == '1'
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '64' if BOUNDED_MEMORY else '0'))
+MEMORY_SNAPSHOT_INTERVAL = float(os.getenv('MEMORY_SNAPSHOT_INTERVAL', '60'))
+# /memtop отвечает только этим чатам; если список пуст, команда выключена
+DEBUG_CHAT_IDS = {int(chat_id) for chat_id in os.getenv('DEBUG_CHAT_IDS', '').split(',') if chat_id.strip()}
+
+memory_stats: dict[str, Any] = {'cycles': 0, 'rss_bytes': None, 'last_cycle': None}
+memory_snapshots: dict[str, tracemalloc.Snapshot] = {}
+memory_snapshot_times: dict[str, float] = {}
+
+bot = Bot(token=os.getenv('BOT_TOKEN', '----------------------------'))
 dp = Dispatcher()
 
 def get_main_keyboard() -> InlineKeyboardMarkup:
@@ -31,6 +108,8 @@ def get_main_keyboard() -> InlineKeyboardMarkup:
     builder.add(InlineKeyboardButton(text="📊 Расписание на неделю", callback_data="week"))
     builder.add(InlineKeyboardButton(text="🔄 Обновить расписание", callback_data="update"))
     builder.add(InlineKeyboardButton(text="📄 HTML расписание", callback_data="html"))
+    builder.add(InlineKeyboardButton(text="🗓 Календарь (.ics)", callback_data="ics"))
+    builder.add(InlineKeyboardButton(text="🧾 JSON расписание", callback_data="json"))
     builder.adjust(2)
     return builder.as_markup()
 
@@ -77,6 +156,25 @@ async def start(message: types.Message) -> None:
     except Exception as e:
         print(f"Не удалось закрепить сообщение: {e}")
 
+@dp.message(Command("memtop"))
+async def memtop(message: types.Message) -> None:
+    """Отладочная команда: топ мест выделения памяти"""
+    if message.chat.id not in DEBUG_CHAT_IDS:
+        return
+    if not tracemalloc.is_tracing():
+        await message.answer("Профилирование памяти выключено. Запустите бота с MEMORY_PROFILE=1")
+        return
+
+    args = (message.text or '').split()
+    limit = min(int(args[1]), 30) if len(args) > 1 and args[1].isdigit() else 10
+    current, peak = tracemalloc.get_traced_memory()
+    rss = get_rss_bytes()
+    await message.answer(
+        f"RSS: {(rss or 0) / 2**20:.1f} МиБ (пик {(get_peak_rss_bytes() or 0) / 2**20:.1f} МиБ)\n"
+        f"tracemalloc: {current / 2**20:.1f} МиБ (пик {peak / 2**20:.1f} МиБ)\n\n"
+        + await asyncio.to_thread(format_top_allocations, limit)
+    )
+
 @dp.callback_query()
 async def handle_callback(callback: types.CallbackQuery) -> None:
     """Обрабатываем callback'и от inline кнопок"""
@@ -88,6 +186,8 @@ async def handle_callback(callback: types.CallbackQuery) -> None:
         await download_schedule(callback.message)
     elif callback.data == "html":
         await send_html_file(callback.message)
+    elif callback.data in EXPORT_FORMATS:
+        await send_schedule_export(callback.message, callback.data)
     elif callback.data == "back":
         await show_main_menu(callback.message)
     
@@ -107,256 +207,357 @@ async def download_schedule(message: types.Message) -> None:
         # Отправляем или редактируем сообщение о загрузке
         status_message = await send_or_edit_message(message.chat.id, "⏳ Загружаю новое расписание...", get_back_keyboard())
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(TABLE_URL)
-            response.raise_for_status()
+        failed_sources = await refresh_sources()
 
-        with open(TEMP_FILE, 'wb') as f:
-            f.write(response.content)
-        
-        df = pd.read_excel(TEMP_FILE, engine='xlrd')
-        
-        # Ищем начало ИСП-11
-        target_row = None
-        for row in range(df.shape[0]):
-            cell_value = str(df.iloc[row, 0])
-            if "Группа - ИСП-11" in cell_value:
-                target_row = row
-                break
-
-        if target_row is None:
-            await status_message.edit_text("❌ Группа ИСП-11 не найдена в таблице.", reply_markup=get_back_keyboard())
+        group = group_index.get(GROUP_NAME)
+        if group is None:
+            # В экономном режиме строки группы освобождаются после сборки страниц: если источник
+            # не изменился или недоступен, остаются страницы и модель прошлого обновления
+            unchanged = any(state['unchanged'] and state['rows_released'] for state in source_state.values())
+            if (failed_sources or unchanged) and get_schedule_model(GROUP_NAME) is not None:
+                load_content_cache()
+                if failed_sources:
+                    text = f"⚠️ Не удалось обновить: {', '.join(failed_sources)} (используются прошлые данные)"
+                else:
+                    text = "✅ Расписание не изменилось с прошлого обновления"
+                await status_message.delete()
+                await bot.send_message(message.chat.id, text, reply_markup=get_main_keyboard())
+                return
+            if failed_sources:
+                errors = "; ".join(f"{name}: {source_state[name]['last_error']}" for name in failed_sources)
+                await status_message.edit_text(f"❌ Ошибка загрузки: {errors}", reply_markup=get_back_keyboard())
+            else:
+                await status_message.edit_text("❌ Группа ИСП-11 не найдена в таблице.", reply_markup=get_back_keyboard())
             return
 
-        # Ищем конец ИСП-11 (до следующей группы)
-        end_row = None
-        for row in range(target_row + 1, df.shape[0]):
-            cell_value = str(df.iloc[row, 0])
-            if "Группа -" in cell_value and "ИСП-11" not in cell_value:
-                end_row = row
-                break
-        
-        if end_row is None:
-            end_row = df.shape[0]
-            
-        # Извлекаем только данные ИСП-11
-        extracted_data = df.iloc[target_row + 1:end_row, :]
-        
-        # Заменяем NaN на пробелы
-        extracted_data = extracted_data.fillna(' ')
+        # Данные ИСП-11 (NaN уже заменены на пробелы при разборе)
+        extracted_data = pd.DataFrame(group['rows'])
         
         extracted_data.to_excel(RESULT_FILE, index=False, header=False, engine='openpyxl')
 
+        # Собираем компактную модель расписания для выгрузок JSON/iCalendar
+        model = build_schedule_model(extracted_data, GROUP_NAME)
+        schedule_models[GROUP_NAME] = model
+        with open(JSON_FILE, 'w', encoding='utf-8') as f:
+            for chunk in iter_schedule_json(model):
+                f.write(chunk)
+        store_content(GROUP_NAME, 'schedule.json', build_export(model, 'json'))
+        store_content(GROUP_NAME, 'schedule.ics', build_export(model, 'ics'))
+
         # Сразу конвертируем в HTML (полное расписание)
         await convert_to_html_and_save(extracted_data)
         
         # Создаем HTML для дня
         await create_day_html(extracted_data)
+
+        # Компактная модель и страницы готовы: строки группы больше не нужны
+        if BOUNDED_MEMORY:
+            del extracted_data, group
+            release_group_rows(GROUP_NAME)
+        await memory_checkpoint('update')
+
+        # Рендерим картинки заранее, чтобы кнопки и HTTP API отдавали их из кэша
+        task = asyncio.create_task(warm_image_cache(GROUP_NAME))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
         
         # Удаляем старое сообщение
         await status_message.delete()
         
         # Отправляем новое сообщение с результатом
-        await bot.send_message(
-            message.chat.id,
-            "✅ Расписание успешно обновлено и конвертировано в HTML!",
-            reply_markup=get_main_keyboard()
-        )
+        text = "✅ Расписание успешно обновлено и конвертировано в HTML!"
+        if failed_sources:
+            text += f"\n⚠️ Не удалось обновить: {', '.join(failed_sources)} (используются прошлые данные)"
+        await bot.send_message(message.chat.id, text, reply_markup=get_main_keyboard())
 
-    except httpx.HTTPError as e:
-        await send_or_edit_message(message.chat.id, f"❌ Ошибка загрузки: {e}", get_back_keyboard())
     except Exception as e:
         await send_or_edit_message(message.chat.id, f"❌ Произошла ошибка: {e}", get_back_keyboard())
-    finally:
-        if os.path.exists(TEMP_FILE):
-            os.remove(TEMP_FILE)
+
+def parse_workbook(content: bytes, only: str | None = None) -> dict[str, list[list[Any]]]:
+    """Разбивает файл расписания на строки по группам (выполняется в отдельном процессе).
+
+    С only собирает строки только этой группы; файл без нее дает пустой словарь.
+    """
+    df = pd.read_excel(io.BytesIO(content), engine='xlrd')
+
+    # Строки с заголовками вида "Группа - ИСП-11"
+    starts = []
+    for row in range(df.shape[0]):
+        group_match = GROUP_RE.search(str(df.iloc[row, 0]))
+        if group_match:
+            starts.append((row, group_match.group(1)))
+
+    groups = {}
+    for i, (start_row, name) in enumerate(starts):
+        if only is not None and name != only:
+            continue
+        end_row = starts[i + 1][0] if i + 1 < len(starts) else df.shape[0]
+        # Заменяем NaN на пробелы; при повторном заголовке группы берем первый блок
+        groups.setdefault(name, df.iloc[start_row + 1:end_row, :].fillna(' ').values.tolist())
+    return groups
+
+def get_parse_executor() -> ProcessPoolExecutor:
+    global parse_executor
+    if parse_executor is None:
+        # spawn: fork из процесса с циклом asyncio и рабочими потоками небезопасен
+        parse_executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS,
+                                             mp_context=multiprocessing.get_context('spawn'))
+    return parse_executor
+
+def check_schedule_sources() -> None:
+    """Проверяет, что имена источников уникальны: по ним хранится их состояние"""
+    names = [source['name'] for source in SCHEDULE_SOURCES]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Повторяющиеся имена в SCHEDULE_SOURCES: {', '.join(duplicates)}")
+
+def rebuild_group_index() -> list[str]:
+    """Собирает общий индекс групп; при совпадении имен побеждает источник выше в списке.
+
+    Возвращает описания групп, найденных сразу в нескольких источниках.
+    """
+    index: dict[str, dict[str, Any]] = {}
+    duplicates = []
+    for source in SCHEDULE_SOURCES:
+        for name, rows in source_state.get(source['name'], {}).get('groups', {}).items():
+            if name in index:
+                duplicates.append(f"{name} ({index[name]['source']}, {source['name']})")
+                continue
+            index[name] = {'source': source['name'], 'rows': rows}
+    group_index.clear()
+    group_index.update(index)
+    return duplicates
+
+async def fetch_source(client: httpx.AsyncClient, source: dict[str, str], semaphore: asyncio.Semaphore) -> bool:
+    """Скачивает и разбирает один источник; возвращает False, если обновить не удалось"""
+    state = source_state.setdefault(source['name'], {
+        'etag': None, 'last_modified': None, 'groups': {},
+        'failures': 0, 'last_error': None, 'retry_at': None, 'updated_at': None,
+        'unchanged': False, 'rows_released': False,
+    })
+
+    # После ошибок источник пропускается до retry_at, остальные обновляются без него
+    if state['retry_at'] and datetime.now() < state['retry_at']:
+        return False
+
+    headers = {}
+    if state['etag']:
+        headers['If-None-Match'] = state['etag']
+    if state['last_modified']:
+        headers['If-Modified-Since'] = state['last_modified']
+
+    try:
+        async with semaphore:
+            response = await client.get(source['url'], headers=headers, timeout=SOURCE_TIMEOUT)
+        state['unchanged'] = response.status_code == 304
+        if not state['unchanged']:
+            response.raise_for_status()
+            loop = asyncio.get_running_loop()
+            # В экономном режиме разбираем только строки нужной группы: остальные не нужны
+            groups = await loop.run_in_executor(get_parse_executor(), parse_workbook, response.content,
+                                                GROUP_NAME if BOUNDED_MEMORY else None)
+            state['groups'] = groups
+            state['rows_released'] = False
+            state['etag'] = response.headers.get('ETag')
+            state['last_modified'] = response.headers.get('Last-Modified')
+            rebuild_group_index()
+    except Exception as e:
+        state['failures'] += 1
+        state['last_error'] = f"{type(e).__name__}: {str(e).splitlines()[0]}" if str(e) else type(e).__name__
+        state['retry_at'] = datetime.now() + timedelta(seconds=min(60 * 2 ** (state['failures'] - 1), 3600))
+        print(f"Не удалось обновить {source['name']}: {state['last_error']}")
+        return False
+
+    state['failures'] = 0
+    state['last_error'] = None
+    state['retry_at'] = None
+    state['updated_at'] = datetime.now()
+    return True
+
+async def refresh_sources() -> list[str]:
+    """Параллельно обновляет все источники; возвращает имена тех, что не обновились"""
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    async with httpx.AsyncClient(timeout=SOURCE_TIMEOUT) as client:
+        results = await asyncio.gather(*(fetch_source(client, source, semaphore) for source in SCHEDULE_SOURCES))
+
+    duplicates = rebuild_group_index()
+    if duplicates:
+        print(f"Группы есть в нескольких источниках, берем первый: {'; '.join(duplicates)}")
+    return [source['name'] for source, ok in zip(SCHEDULE_SOURCES, results) if not ok]
+
+def compile_css(css: str) -> str:
+    """Сжимает таблицу стилей один раз при импорте: убирает переносы и лишние пробелы"""
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};:,])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+# Общие стили недели и дня
+BASE_CSS = """
+    body {
+        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Noto Sans', Helvetica, Arial, sans-serif;
+        margin: 0;
+        padding: 20px;
+        background-color: #0d1117;
+        color: #c9d1d9;
+        line-height: 1.6;
+    }
+    .container {
+        margin: 0 auto;
+        background-color: #161b22;
+        border: 1px solid #30363d;
+        border-radius: 6px;
+        box-shadow: 0 8px 24px rgba(1, 4, 9, 0.12);
+        overflow: hidden;
+        display: flex;
+        flex-direction: column;
+    }
+    .table {
+        border-collapse: collapse;
+        width: 100%;
+        background-color: #161b22;
+        font-size: 16px;
+    }
+    .table td {
+        border: 1px solid #30363d;
+        padding: 20px 16px;
+        text-align: left;
+        vertical-align: top;
+    }
+    .update-time {
+        text-align: center;
+        color: #8b949e;
+        font-style: italic;
+        margin: 0;
+        background-color: #21262d;
+        border-top: 1px solid #30363d;
+        font-size: 14px;
+    }
+"""
+
+# Первая строка недели — заголовок с датами; строки 2-20 в исходной разметке
+# красились через nth-child в обратном чередовании, с 21-й — в обычном
+WEEK_CSS = compile_css(BASE_CSS + """
+    body { min-height: 100vh; }
+    .container { width: 1380px; }
+    .table tr:nth-child(even) { background-color: #161b22; }
+    .table tr:nth-child(odd) { background-color: #1c2128; }
+    .table tr:nth-child(n+21):nth-child(even) { background-color: #1c2128; }
+    .table tr:nth-child(n+21):nth-child(odd) { background-color: #161b22; }
+    .table tr:hover {
+        background-color: #21262d;
+        transition: background-color 0.2s ease;
+    }
+    .table tr:first-child {
+        background-color: #1f6feb !important;
+        color: #f0f6fc;
+        font-weight: 600;
+        font-size: 14px;
+    }
+""")
+
+DAY_CSS = compile_css(BASE_CSS + """
+    .container { width: 680px; }
+    .time-info {
+        background-color: #1c2128;
+        padding: 20px;
+        text-align: center;
+        color: #58a6ff;
+        font-size: 1.1em;
+        border-bottom: 1px solid #30363d;
+    }
+    .table { margin: 0; flex: 1; }
+    .table tr:nth-child(even) { background-color: #1c2128; }
+    .table tr:nth-child(odd) { background-color: #161b22; }
+    .table tr:first-child {
+        background-color: #1f6feb !important;
+        color: #f0f6fc;
+        font-weight: 600;
+        font-size: 14px;
+    }
+    .table .head { text-align: center; font-weight: 600; }
+    .table .num { text-align: center; font-weight: 600; color: #58a6ff; }
+    .table .slot { text-align: center; color: #8b949e; }
+    .table .no-pairs { text-align: center; color: #238636; font-size: 1.5em; padding: 40px; }
+    .subject { font-weight: 600; color: #f0f6fc; margin-bottom: 8px; font-size: 1.1em; }
+    .teacher { color: #8b949e; margin-bottom: 5px; }
+    .room { color: #238636; font-weight: 600; }
+""")
+
+# Неизменяемые куски страницы; заголовок, тело и время обновления подставляются между ними
+PAGE_HEAD = '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>'
+PAGE_STYLE = '</title>\n<style>'
+PAGE_BODY = '</style>\n</head>\n<body>\n<div class="container">\n'
+PAGE_UPDATED = '<div class="update-time">Обновлено: '
+PAGE_TAIL = '</div>\n</div>\n</body>\n</html>\n'
+
+# Как DataFrame.to_html: управляющие символы в ячейках выводятся экранированными
+CELL_ESCAPES = str.maketrans({'\t': '\\t', '\r': '\\r', '\n': '\\n'})
+
+DEFAULT_TIME_SLOTS = ['08.00-09.30', '09.40-11.10', '11.20-12.50', '13.20-14.50']
+DAY_TABLE_ROWS = 8
+
+def render_page(title: str, css: str, body: list[str]) -> str:
+    """Собирает страницу из заранее подготовленных кусков одним join"""
+    return ''.join([
+        PAGE_HEAD, escape(title), PAGE_STYLE, css, PAGE_BODY,
+        *body,
+        PAGE_UPDATED, datetime.now().strftime('%d.%m.%Y %H:%M'), PAGE_TAIL,
+    ])
 
 async def convert_to_html_and_save(df: pd.DataFrame) -> None:
-    # Фильтруем пустые строки и убираем субботу
-    filtered_data = []
-    for row_idx in range(df.shape[0]):
-        row_data = df.iloc[row_idx, :]
-        # Проверяем есть ли данные в строке (исключая первые 2 колонки - номер и время)
-        has_data = any(str(cell).strip() not in ['nan', ' ', ''] for cell in row_data[2:7])  # Пн-Пт (колонки 2-7)
-        if has_data:
-            filtered_data.append(row_data)
-    
-    # Создаем новый DataFrame только с непустыми строками
-    filtered_df = pd.DataFrame(filtered_data)
-    
+    # Фильтруем пустые строки (проверяем Пн-Пт, колонки 2-7) и убираем субботу
+    rows = [row[:7] for row in df.values.tolist()
+            if any(str(cell).strip() not in ('nan', '') for cell in row[2:7])]
+
     # Убираем строку "Дисциплина, вид занятия, преподаватель"
-    if filtered_df.shape[0] > 1:
-        # Удаляем вторую строку (индекс 1)
-        filtered_df = filtered_df.drop(filtered_df.index[1])
-    
-    # Создаем красивый HTML с полным расписанием (только Пн-Пт)
-    html_content = filtered_df.iloc[:, :7].to_html(index=False, header=False, classes='table table-striped')
-    
-    full_html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <title>Расписание ИСП-11</title>
-        <style>
-            body {{ 
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Noto Sans', Helvetica, Arial, sans-serif;
-                margin: 0;
-                padding: 20px;
-                background-color: #0d1117;
-                color: #c9d1d9;
-                line-height: 1.6;
-                min-height: 100vh;
-            }}
-            .container {{
-                width: 1380px;
-                margin: 0 auto;
-                background-color: #161b22;
-                border: 1px solid #30363d;
-                border-radius: 6px;
-                box-shadow: 0 8px 24px rgba(1, 4, 9, 0.12);
-                overflow: hidden;
-                display: flex;
-                flex-direction: column;
-            }}
-            .table {{ 
-                border-collapse: collapse; 
-                width: 100%; 
-                background-color: #161b22;
-                font-size: 16px;
-            }}
-            .table td, .table th {{ 
-                border: 1px solid #30363d; 
-                padding: 20px 16px; 
-                text-align: left; 
-                vertical-align: top;
-            }}
-            .table th {{ 
-                background-color: #21262d;
-                color: #f0f6fc;
-                font-weight: 600;
-                text-transform: uppercase;
-                letter-spacing: 0.5px;
-                font-size: 12px;
-            }}
-            .table tr:nth-child(even) {{ 
-                background-color: #1c2128; 
-            }}
-            .table tr:nth-child(odd) {{
-                background-color: #161b22;
-            }}
-            .table tr:hover {{
-                background-color: #21262d;
-                transition: background-color 0.2s ease;
-            }}
-            .table tr:first-child {{
-                background-color: #1f6feb !important;
-                color: #f0f6fc;
-                font-weight: 600;
-                font-size: 14px;
-            }}
-            .table tr:nth-child(2) {{
-                background-color: #161b22;
-            }}
-            .table tr:nth-child(3) {{
-                background-color: #1c2128;
-            }}
-            .table tr:nth-child(4) {{
-                background-color: #161b22;
-            }}
-            .table tr:nth-child(5) {{
-                background-color: #1c2128;
-            }}
-            .table tr:nth-child(6) {{
-                background-color: #161b22;
-            }}
-            .table tr:nth-child(7) {{
-                background-color: #1c2128;
-            }}
-            .table tr:nth-child(8) {{
-                background-color: #161b22;
-            }}
-            .table tr:nth-child(9) {{
-                background-color: #1c2128;
-            }}
-            .table tr:nth-child(10) {{
-                background-color: #161b22;
-            }}
-            .table tr:nth-child(11) {{
-                background-color: #1c2128;
-            }}
-            .table tr:nth-child(12) {{
-                background-color: #161b22;
-            }}
-            .table tr:nth-child(13) {{
-                background-color: #1c2128;
-            }}
-            .table tr:nth-child(14) {{
-                background-color: #161b22;
-            }}
-            .table tr:nth-child(15) {{
-                background-color: #1c2128;
-            }}
-            .table tr:nth-child(16) {{
-                background-color: #161b22;
-            }}
-            .table tr:nth-child(17) {{
-                background-color: #1c2128;
-            }}
-            .table tr:nth-child(18) {{
-                background-color: #161b22;
-            }}
-            .table tr:nth-child(19) {{
-                background-color: #1c2128;
-            }}
-            .table tr:nth-child(20) {{
-                background-color: #161b22;
-            }}
-            .update-time {{
-                text-align: center;
-                color: #8b949e;
-                font-style: italic;
-                background-color: #21262d;
-                border-top: 1px solid #30363d;
-                font-size: 14px;
-            }}
-            .time-column {{
-                background-color: #21262d !important;
-                color: #58a6ff;
-                font-weight: 600;
-                font-family: 'SFMono-Regular', Consolas, 'Liberation Mono', Menlo, monospace;
-            }}
-            .empty-cell {{
-                color: #484f58;
-                font-style: italic;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            {html_content}
-            <div class="update-time">
-                Обновлено: {datetime.now().strftime('%d.%m.%Y %H:%M')}
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
+    if len(rows) > 1:
+        del rows[1]
+
+    body = ['<table border="1" class="table">\n<tbody>\n']
+    for row in rows:
+        body.append('<tr>')
+        body.extend(f'<td>{escape(str(cell).translate(CELL_ESCAPES), quote=False)}</td>' for cell in row)
+        body.append('</tr>\n')
+    body.append('</tbody>\n</table>\n')
+
+    full_html = render_page('Расписание ИСП-11', WEEK_CSS, body)
+
     # Сохраняем HTML файл
     with open(HTML_FILE, 'w', encoding='utf-8') as f:
         f.write(full_html)
+    store_content(GROUP_NAME, 'week.html', full_html.encode('utf-8'))
+
+def day_row(number: Any, time_slot: str, content: str = '', content_class: str = '') -> str:
+    """Строка таблицы дня: номер пары, время и ячейка на пять колонок"""
+    attrs = f' class="{content_class}"' if content_class else ''
+    return (f'<tr><td class="num">{number}</td><td class="slot">{time_slot}</td>'
+            f'<td colspan="5"{attrs}>{content}</td></tr>\n')
+
+def pair_content(pair: dict[str, str]) -> str:
+    parts = [f'<div class="subject">{pair["subject"]}</div>']
+    if pair['teacher']:
+        parts.append(f'<div class="teacher">{pair["teacher"]}</div>')
+    if pair['classroom']:
+        parts.append(f'<div class="room">Ауд. {pair["classroom"]}</div>')
+    return ''.join(parts)
+
+def empty_day_row(i: int, content: str = '', content_class: str = '') -> str:
+    """Строка без пары: номер и время только у первых четырех"""
+    if i < len(DEFAULT_TIME_SLOTS):
+        return day_row(i + 1, DEFAULT_TIME_SLOTS[i], content, content_class)
+    return day_row('', '', content, content_class)
 
 async def create_day_html(df: pd.DataFrame) -> None:
     """Создаем отдельный HTML файл для расписания на день в виде таблицы"""
     # Умно определяем дату
     target_date, reason = get_smart_date_for_schedule()
     weekday_names = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница"]
+    rows = df.values.tolist()
     
     # Ищем расписание на целевую дату
     day_col = None
     for col in range(2, df.shape[1]):
-        cell_value = str(df.iloc[0, col])
+        cell_value = str(rows[0][col])
         if weekday_names[target_date.weekday()] in cell_value and target_date.strftime('%d.%m.%Y') in cell_value:
             day_col = col
             break
@@ -364,9 +565,9 @@ async def create_day_html(df: pd.DataFrame) -> None:
     # Если не найдено, ищем последнее доступное
     if day_col is None:
         for col in range(2, df.shape[1]):
-            cell_value = str(df.iloc[0, col])
+            cell_value = str(rows[0][col])
             if weekday_names[target_date.weekday()] in cell_value:
-                date_match = re.search(r'(\d{2}\.\d{2}\.\d{4})', cell_value)
+                date_match = DATE_RE.search(cell_value)
                 if date_match:
                     found_date = datetime.strptime(date_match.group(1), '%d.%m.%Y').date()
                     if found_date <= target_date:
@@ -379,218 +580,399 @@ async def create_day_html(df: pd.DataFrame) -> None:
         return
 
     current_weekday_name = weekday_names[target_date.weekday()]
+    day_title = f"{current_weekday_name}, {target_date.strftime('%d.%m.%Y')}"
     
     # Собираем пары для дня
     pairs = []
     first_pair_time = None
     
-    for row in range(1, df.shape[0]):
-        time_slot = str(df.iloc[row, 1]).strip()
-        if not time_slot or time_slot == 'nan' or time_slot == ' ':
+    for row in rows[1:]:
+        time_slot = str(row[1]).strip()
+        if not time_slot or time_slot == 'nan':
             continue
             
-        cell_value = str(df.iloc[row, day_col]).strip()
-        if not cell_value or cell_value == 'nan' or cell_value == ' ':
+        cell_value = str(row[day_col]).strip()
+        if not cell_value or cell_value == 'nan':
             continue
             
         if first_pair_time is None:
             first_pair_time = time_slot.split('-')[0].strip()
             
-        lines = cell_value.split('\n')
-        subject = lines[0].strip() if lines else ""
-        teacher = ""
-        classroom = ""
-        
-        if len(lines) > 1:
-            second_line = lines[1].strip()
-            if "аудитория" in second_line:
-                parts = second_line.split("аудитория")
-                teacher = parts[0].strip()
-                classroom = parts[1].strip() if len(parts) > 1 else ""
-                if classroom and not re.match(r'^\d{3}$', classroom):
-                    classroom = ""
-            else:
-                teacher = second_line
-                
-        pairs.append({
-            'time': time_slot,
-            'subject': subject,
-            'teacher': teacher,
-            'classroom': classroom
-        })
+        pairs.append({'time': time_slot, **parse_pair_cell(cell_value)})
 
-    # Создаем HTML для дня в виде таблицы
+    # Создаем таблицу дня
+    table_rows = []
     if not pairs:
-        # Создаем пустую таблицу для дня без пар
-        table_rows = ""
-        for i in range(8):  # 8 строк для заполнения высоты
-            table_rows += f"""
-                <tr>
-                    <td style="text-align: center; font-weight: 600; color: #58a6ff;">{i + 1 if i < 4 else ''}</td>
-                    <td style="text-align: center; color: #8b949e;">{['08.00-09.30', '09.40-11.10', '11.20-12.50', '13.20-14.50'][i] if i < 4 else ''}</td>
-                    <td colspan="5" style="text-align: center; color: #238636; font-size: 1.5em; padding: 40px;">
-                        На {current_weekday_name}, {target_date.strftime('%d.%m.%Y')} пар нет!
-                    </td>
-                </tr>
-            """
+        # Пустая таблица для дня без пар
+        for i in range(DAY_TABLE_ROWS):
+            table_rows.append(empty_day_row(i, f'На {day_title} пар нет!', 'no-pairs'))
     else:
-        # Создаем таблицу с парами
-        table_rows = ""
-        
-        # Определяем, есть ли первая пара (8:00)
+        # Если первой пары (8:00) нет, первая строка пустая с номером 1, остальные нумеруем с 2
         has_first_pair = any(pair['time'].startswith('08.00') for pair in pairs)
-        
-        if has_first_pair:
-            # Если первая пара есть, нумеруем как обычно
-            for i, pair in enumerate(pairs):
-                table_rows += f"""
-                    <tr>
-                        <td style="text-align: center; font-weight: 600; color: #58a6ff;">{i + 1}</td>
-                        <td style="text-align: center; color: #8b949e;">{pair['time']}</td>
-                        <td colspan="5">
-                            <div style="font-weight: 600; color: #f0f6fc; margin-bottom: 8px; font-size: 1.1em;">{pair['subject']}</div>
-                            {f'<div style="color: #8b949e; margin-bottom: 5px;">{pair["teacher"]}</div>' if pair['teacher'] else ''}
-                            {f'<div style="color: #238636; font-weight: 600;">Ауд. {pair["classroom"]}</div>' if pair['classroom'] else ''}
-                        </td>
-                    </tr>
-                """
-        else:
-            # Если первой пары нет, первая строка пустая с номером 1
-            table_rows += f"""
-                <tr>
-                    <td style="text-align: center; font-weight: 600; color: #58a6ff;">1</td>
-                    <td style="text-align: center; color: #8b949e;">08.00-09.30</td>
-                    <td colspan="5"></td>
-                </tr>
-            """
-            
-            # Остальные пары нумеруем начиная с 2
-            for i, pair in enumerate(pairs):
-                table_rows += f"""
-                    <tr>
-                        <td style="text-align: center; font-weight: 600; color: #58a6ff;">{i + 2}</td>
-                        <td style="text-align: center; color: #8b949e;">{pair['time']}</td>
-                        <td colspan="5">
-                            <div style="font-weight: 600; color: #f0f6fc; margin-bottom: 8px; font-size: 1.1em;">{pair['subject']}</div>
-                            {f'<div style="color: #8b949e; margin-bottom: 5px;">{pair["teacher"]}</div>' if pair['teacher'] else ''}
-                            {f'<div style="color: #238636; font-weight: 600;">Ауд. {pair["classroom"]}</div>' if pair['classroom'] else ''}
-                        </td>
-                    </tr>
-                """
-        
+        offset = 1 if has_first_pair else 2
+        if not has_first_pair:
+            table_rows.append(day_row(1, DEFAULT_TIME_SLOTS[0]))
+        for i, pair in enumerate(pairs):
+            table_rows.append(day_row(i + offset, pair['time'], pair_content(pair)))
+
         # Добавляем пустые строки для заполнения высоты
-        total_rows = len(pairs) + (0 if has_first_pair else 1)
-        for i in range(total_rows, 8):
-            table_rows += f"""
-                <tr>
-                    <td style="text-align: center; font-weight: 600; color: #58a6ff;">{i + 1 if i < 4 else ''}</td>
-                    <td style="text-align: center; color: #8b949e;">{['08.00-09.30', '09.40-11.10', '11.20-12.50', '13.20-14.50'][i] if i < 4 else ''}</td>
-                    <td colspan="5"></td>
-                </tr>
-            """
-    
-    day_html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <title>Расписание на {current_weekday_name}</title>
-        <style>
-            body {{ 
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Noto Sans', Helvetica, Arial, sans-serif;
-                margin: 0;
-                padding: 20px;
-                background-color: #0d1117;
-                color: #c9d1d9;
-                line-height: 1.6;
-            }}
-            .container {{
-                width: 680px;
-                margin: 0 auto;
-                background-color: #161b22;
-                border: 1px solid #30363d;
-                border-radius: 6px;
-                box-shadow: 0 8px 24px rgba(1, 4, 9, 0.12);
-                overflow: hidden;
-                display: flex;
-                flex-direction: column;
-            }}
-            .time-info {{
-                background-color: #1c2128;
-                padding: 20px;
-                text-align: center;
-                color: #58a6ff;
-                font-size: 1.1em;
-                border-bottom: 1px solid #30363d;
-            }}
-            .table {{
-                border-collapse: collapse;
-                width: 100%;
-                background-color: #161b22;
-                font-size: 16px;
-                margin: 0;
-                flex: 1;
-            }}
-            .table td, .table th {{
-                border: 1px solid #30363d;
-                padding: 20px 16px;
-                text-align: left;
-                vertical-align: top;
-            }}
-            .table tr:nth-child(even) {{
-                background-color: #1c2128;
-            }}
-            .table tr:nth-child(odd) {{
-                background-color: #161b22;
-            }}
-            .table tr:first-child {{
-                background-color: #1f6feb !important;
-                color: #f0f6fc;
-                font-weight: 600;
-                font-size: 14px;
-            }}
-            .update-time {{
-                text-align: center;
-                color: #8b949e;
-                font-style: italic;
-                margin: 0;
-                background-color: #21262d;
-                border-top: 1px solid #30363d;
-                font-size: 14px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="time-info">
-                Приходить к: {first_pair_time}
-            </div>
-            <table class="table">
-                <tr>
-                    <td style="text-align: center; font-weight: 600;">№</td>
-                    <td style="text-align: center; font-weight: 600;">Время</td>
-                    <td colspan="5" style="text-align: center; font-weight: 600;">{current_weekday_name}, {target_date.strftime('%d.%m.%Y')}</td>
-                </tr>
-                {table_rows}
-            </table>
-            <div class="update-time">
-                Обновлено: {datetime.now().strftime('%d.%m.%Y %H:%M')}
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+        for i in range(len(table_rows), DAY_TABLE_ROWS):
+            table_rows.append(empty_day_row(i))
+
+    body = [
+        f'<div class="time-info">Приходить к: {first_pair_time}</div>\n',
+        '<table class="table">\n',
+        f'<tr><td class="head">№</td><td class="head">Время</td><td colspan="5" class="head">{day_title}</td></tr>\n',
+        *table_rows,
+        '</table>\n',
+    ]
+    day_html = render_page(f'Расписание на {current_weekday_name}', DAY_CSS, body)
     
     # Сохраняем HTML файл для дня
     with open(DAY_HTML_FILE, 'w', encoding='utf-8') as f:
         f.write(day_html)
+    store_content(GROUP_NAME, 'day.html', day_html.encode('utf-8'))
+
+def parse_pair_cell(cell_value: str) -> dict[str, str]:
+    """Разбирает ячейку пары на предмет, преподавателя и аудиторию"""
+    lines = cell_value.split('\n')
+    subject = lines[0].strip() if lines else ""
+    teacher = ""
+    classroom = ""
+
+    if len(lines) > 1:
+        second_line = lines[1].strip()
+        if "аудитория" in second_line:
+            parts = second_line.split("аудитория")
+            teacher = parts[0].strip()
+            classroom = parts[1].strip() if len(parts) > 1 else ""
+            if classroom and not re.match(r'^\d{3}$', classroom):
+                classroom = ""
+        else:
+            teacher = second_line
+
+    return {'subject': subject, 'teacher': teacher, 'classroom': classroom}
+
+def build_schedule_model(df: pd.DataFrame, group: str) -> dict[str, Any]:
+    """Собирает компактную модель расписания группы из таблицы"""
+    days = []
+    for col in range(2, df.shape[1]):
+        header = str(df.iloc[0, col]).strip()
+        date_match = DATE_RE.search(header)
+        if not date_match:
+            continue
+
+        pairs = []
+        for row in range(1, df.shape[0]):
+            time_slot = str(df.iloc[row, 1]).strip()
+            if not TIME_SLOT_RE.search(time_slot):
+                continue
+
+            cell_value = str(df.iloc[row, col]).strip()
+            if not cell_value or cell_value == 'nan':
+                continue
+
+            number = str(df.iloc[row, 0]).strip()
+            pairs.append({
+                'number': number if number.isdigit() else None,
+                'time': time_slot,
+                **parse_pair_cell(cell_value),
+            })
+
+        day_date = datetime.strptime(date_match.group(1), '%d.%m.%Y').date()
+        days.append({
+            'date': day_date.isoformat(),
+            'weekday': header[:date_match.start()].strip(' ,') or header,
+            'pairs': pairs,
+        })
+
+    # Версия зависит только от содержимого, поэтому повторная загрузка того же файла не сбрасывает кэш
+    digest = hashlib.sha1(json.dumps(days, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+    return {'group': group, 'version': digest.hexdigest()[:12], 'days': days}
+
+def get_schedule_model(group: str) -> dict[str, Any] | None:
+    """Возвращает модель группы из памяти или из сохраненного JSON"""
+    model = schedule_models.get(group)
+    if model is None and group == GROUP_NAME and os.path.exists(JSON_FILE):
+        with open(JSON_FILE, 'r', encoding='utf-8') as f:
+            model = json.load(f)
+        schedule_models[group] = model
+    return model
+
+def iter_schedule_json(model: dict[str, Any]) -> Iterator[str]:
+    """Построчно отдает JSON модели, не собирая весь документ в памяти"""
+    yield '{"group": %s, "version": %s, "days": [' % (
+        json.dumps(model['group'], ensure_ascii=False), json.dumps(model['version']))
+    for i, day in enumerate(model['days']):
+        yield (',\n' if i else '\n') + json.dumps(day, ensure_ascii=False)
+    yield '\n]}\n'
+
+def _ics_escape(text: str) -> str:
+    return (text.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+def _ics_fold(line: str) -> str:
+    """Переносит строку iCalendar по 75 октетов (RFC 5545, 3.1)"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    start, limit = 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Не разрываем многобайтовые символы UTF-8
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode('utf-8'))
+        start, limit = end, 74
+    return '\r\n '.join(parts) + '\r\n'
+
+def slot_bounds(day_date: date, time_slot: str) -> tuple[datetime, datetime] | None:
+    """Начало и конец пары по строке вида "08.00-09.30"; None, если слот не разобрать"""
+    slot = TIME_SLOT_RE.search(time_slot)
+    if not slot:
+        return None
+    start_h, start_m, end_h, end_m = map(int, slot.groups())
+    midnight = datetime.combine(day_date, dtime())
+    start = midnight + timedelta(hours=start_h, minutes=start_m)
+    # Через timedelta, чтобы "24.00" не ломало выгрузку
+    end = midnight + timedelta(hours=end_h, minutes=end_m)
+    if end <= start:
+        return None
+    return start, end
+
+def iter_schedule_ics(model: dict[str, Any]) -> Iterator[str]:
+    """Построчно отдает календарь iCalendar с парами в часовом поясе Саратова"""
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    yield from map(_ics_fold, [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//ISP bot//Raspisanie//RU',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:Расписание {_ics_escape(model["group"])}',
+        'X-WR-TIMEZONE:Europe/Saratov',
+        'BEGIN:VTIMEZONE',
+        'TZID:Europe/Saratov',
+        'BEGIN:STANDARD',
+        'DTSTART:19700101T000000',
+        'TZOFFSETFROM:+0400',
+        'TZOFFSETTO:+0400',
+        'TZNAME:+04',
+        'END:STANDARD',
+        'END:VTIMEZONE',
+    ])
+    for day in model['days']:
+        day_date = date.fromisoformat(day['date'])
+        for pair in day['pairs']:
+            bounds = slot_bounds(day_date, pair['time'])
+            if bounds is None:
+                continue
+            start, end = bounds
+            description = '\n'.join(filter(None, [pair['teacher'], pair['time']]))
+            lines = [
+                'BEGIN:VEVENT',
+                f'UID:{model["group"]}-{start:%Y%m%dT%H%M}@ppk.sstu.ru',
+                f'DTSTAMP:{stamp}',
+                f'DTSTART;TZID=Europe/Saratov:{start:%Y%m%dT%H%M%S}',
+                f'DTEND;TZID=Europe/Saratov:{end:%Y%m%dT%H%M%S}',
+                f'SUMMARY:{_ics_escape(pair["subject"])}',
+                f'DESCRIPTION:{_ics_escape(description)}',
+            ]
+            if pair['classroom']:
+                lines.append(f'LOCATION:{_ics_escape("Ауд. " + pair["classroom"])}')
+            lines.append('END:VEVENT')
+            yield from map(_ics_fold, lines)
+    yield _ics_fold('END:VCALENDAR')
+
+EXPORT_FORMATS = {
+    'json': (iter_schedule_json, 'json', "🧾 JSON версия расписания"),
+    'ics': (iter_schedule_ics, 'ics', "🗓 Календарь расписания для импорта"),
+}
+
+def build_export(model: dict[str, Any], fmt: str) -> bytes:
+    """Собирает выгрузку из генератора, кэшируя результат по группе и версии"""
+    key = (model['group'], model['version'], fmt)
+    data = export_cache.get(key)
+    if data is None:
+        iter_chunks = EXPORT_FORMATS[fmt][0]
+        data = b''.join(chunk.encode('utf-8') for chunk in iter_chunks(model))
+        # Старые версии этой группы больше не нужны
+        for old_key in [k for k in export_cache if k[0] == key[0] and k[2] == fmt]:
+            del export_cache[old_key]
+        export_cache[key] = data
+        trim_cache(export_cache)
+    return data
+
+def store_content(group: str, name: str, body: bytes) -> dict[str, Any]:
+    """Кладет готовый документ в кэш, заранее считая ETag и gzip-версию"""
+    content_type = CONTENT_TYPES[name]
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    entry = {
+        'body': body,
+        'etag': f'"{etag}"',
+        'content_type': content_type,
+        # PNG уже сжат, gzip имеет смысл только для текстовых форматов
+        'gzip': None if content_type.startswith('image/') else gzip.compress(body, 6),
+        'gzip_etag': f'"{etag}-gz"',
+    }
+    previous = content_cache.pop((group, name), None)
+    content_cache[(group, name)] = entry
+    if name in RENDERED_FROM and (previous is None or previous['etag'] != entry['etag']):
+        content_cache.pop((group, RENDERED_FROM[name]), None)
+    trim_cache(content_cache)
+    return entry
+
+def trim_cache(cache: dict[Any, Any]) -> None:
+    """Удаляет самые старые записи сверх CACHE_MAX_ENTRIES (0 — без ограничения)"""
+    if CACHE_MAX_ENTRIES:
+        while len(cache) > CACHE_MAX_ENTRIES:
+            del cache[next(iter(cache))]
+
+def get_rss_bytes() -> int | None:
+    """Текущий RSS процесса; None там, где нет /proc (например, Windows)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def get_peak_rss_bytes() -> int | None:
+    """Пиковый RSS процесса по данным ядра (VmHWM), а не только по моментам замеров"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+async def memory_checkpoint(label: str) -> None:
+    """Замер памяти в конце цикла обновления или рендера"""
+    memory_stats['cycles'] += 1
+    memory_stats['last_cycle'] = label
+    rss = get_rss_bytes()
+    memory_stats['rss_bytes'] = rss
+
+    if not tracemalloc.is_tracing():
+        return
+    # Снимок tracemalloc дорогой: не чаще раза в MEMORY_SNAPSHOT_INTERVAL и не в цикле событий
+    now = time.monotonic()
+    if now - memory_snapshot_times.get(label, float('-inf')) < MEMORY_SNAPSHOT_INTERVAL:
+        return
+    memory_snapshot_times[label] = now
+    await asyncio.to_thread(take_memory_snapshot, label, rss)
+
+def take_memory_snapshot(label: str, rss: int | None) -> None:
+    """Снимок tracemalloc и сравнение с прошлым снимком того же цикла"""
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+    ])
+    previous = memory_snapshots.get(label)
+    memory_snapshots[label] = snapshot
+    current, peak = tracemalloc.get_traced_memory()
+    print(f"[память] {label}: RSS {(rss or 0) / 2**20:.1f} МиБ, "
+          f"tracemalloc {current / 2**20:.1f} МиБ (пик {peak / 2**20:.1f} МиБ)")
+    if previous is not None:
+        for stat in snapshot.compare_to(previous, 'lineno')[:5]:
+            print(f"[память]   {stat}")
+
+def release_group_rows(group: str) -> None:
+    """Забывает разобранные строки группы, когда страницы и модель уже собраны"""
+    group_index.pop(group, None)
+    # Из всех источников: иначе при следующей сборке индекса группу займет дубликат из другого файла
+    for state in source_state.values():
+        if state['groups'].pop(group, None) is not None:
+            # Валидаторы остаются: ответ 304 значит, что собранные из этих строк страницы актуальны
+            state['rows_released'] = True
+
+def format_top_allocations(limit: int = 10) -> str:
+    """Топ мест выделения памяти по свежему снимку tracemalloc"""
+    snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    lines = []
+    for stat in snapshot.statistics('lineno')[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:.1f} КиБ, {stat.count} блоков — {os.path.basename(frame.filename)}:{frame.lineno}")
+    return "\n".join(lines)
+
+def load_content_cache() -> None:
+    """Заполняет кэш из файлов, сохраненных до перезапуска бота"""
+    for name, path in PAGE_FILES.items():
+        if (GROUP_NAME, name) not in content_cache and os.path.exists(path):
+            with open(path, 'rb') as f:
+                store_content(GROUP_NAME, name, f.read())
+    model = get_schedule_model(GROUP_NAME)
+    if model is not None:
+        for fmt in EXPORT_FORMATS:
+            store_content(GROUP_NAME, f'schedule.{fmt}', build_export(model, fmt))
+
+async def get_schedule_image(group: str, name: str) -> bytes | None:
+    """Возвращает картинку из кэша, при необходимости рендерит ее в отдельном потоке"""
+    entry = content_cache.get((group, name))
+    if entry is not None:
+        return entry['body']
+
+    # Один рендер на картинку: остальные запросы ждут его результат
+    async with render_locks.setdefault((group, name), asyncio.Lock()):
+        entry = content_cache.get((group, name))
+        if entry is not None:
+            return entry['body']
+
+        source_name = IMAGE_SPECS[name][0]
+        source = content_cache.get((group, source_name))
+        image_bytes = await asyncio.to_thread(create_schedule_image, name)
+
+        # Не кэшируем картинку, если страница успела обновиться во время рендера
+        if image_bytes is not None and content_cache.get((group, source_name)) is source:
+            store_content(group, name, image_bytes)
+
+    await memory_checkpoint('render')
+    return image_bytes
+
+async def warm_image_cache(group: str) -> None:
+    """Заранее рендерит картинки недели и дня в одной сессии браузера"""
+    missing = [name for name in IMAGE_SPECS if (group, name) not in content_cache]
+    if not missing:
+        return
+
+    # Держим блокировки картинок на время пакета, чтобы нажатия ждали его, а не рендерили повторно
+    async with contextlib.AsyncExitStack() as stack:
+        for name in missing:
+            await stack.enter_async_context(render_locks.setdefault((group, name), asyncio.Lock()))
+
+        sources = {}
+        documents = {}
+        for name in missing:
+            source_name, size, _ = IMAGE_SPECS[name]
+            source = content_cache.get((group, source_name))
+            if source is not None and (group, name) not in content_cache:
+                sources[name] = source
+                documents[name] = (source['body'].decode('utf-8'), size)
+        if not documents:
+            return
+
+        try:
+            images = await render_html_batch(documents)
+        except Exception as e:
+            print(f"Пакетный рендер недоступен: {e}")
+            images = {}
+
+        for name, image_bytes in images.items():
+            source_name, _, crop_height = IMAGE_SPECS[name]
+            if content_cache.get((group, source_name)) is sources[name]:
+                store_content(group, name, await asyncio.to_thread(crop_bottom_200px, image_bytes, crop_height))
+        del images
+
+    await memory_checkpoint('render-batch')
+
+    # Что не получилось отрендерить пакетом, рендерим по одной через html2image
+    for name in documents:
+        await get_schedule_image(group, name)
 
 def get_saratov_time() -> datetime:
     """Получаем текущее время в Саратове (UTC+4)"""
-    from datetime import timezone, timedelta
-    utc_now = datetime.now(timezone.utc)
-    saratov_tz = timezone(timedelta(hours=4))
-    return utc_now.astimezone(saratov_tz)
+    return datetime.now(timezone.utc).astimezone(SARATOV_TZ)
 
 def get_smart_date_for_schedule() -> tuple[datetime.date, str]:
     """Умно определяем дату для расписания"""
@@ -628,91 +1010,219 @@ def crop_bottom_200px(image_bytes: bytes, target_height: int) -> bytes:
         print(f"Ошибка обрезки фото: {e}")
         return image_bytes
 
-def create_today_image() -> bytes:
-    """Создаем фото из HTML файла дня с полными стилями"""
-    if not os.path.exists(DAY_HTML_FILE):
+def create_schedule_image(name: str) -> bytes | None:
+    """Создаем фото из сохраненного HTML файла страницы с полными стилями"""
+    source_name, size, crop_height = IMAGE_SPECS[name]
+    html_file = PAGE_FILES[source_name]
+    if not os.path.exists(html_file):
         return None
     
+    temp_file = f"render_{name}"
     try:
         hti = Html2Image()
         hti.output_path = '.'
-        
-        # Указываем путь к Chrome
-        chrome_paths = [
-            r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-            r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
-            r"C:\Users\{}\AppData\Local\Google\Chrome\Application\chrome.exe".format(os.getenv('USERNAME', '')),
-        ]
-        
-        for path in chrome_paths:
-            if os.path.exists(path):
-                hti.browser_executable = path
-                break
+        hti.browser_executable = find_browser_executable()
         
         # Читаем HTML файл
-        with open(DAY_HTML_FILE, 'r', encoding='utf-8') as f:
+        with open(html_file, 'r', encoding='utf-8') as f:
             html_content = f.read()
         
         # Создаем фото с увеличенным размером
-        hti.screenshot(html_str=html_content, save_as='today_schedule.png', size=(680, 1040))
+        hti.screenshot(html_str=html_content, save_as=temp_file, size=size)
         
         # Читаем созданное фото
-        with open('today_schedule.png', 'rb') as f:
+        with open(temp_file, 'rb') as f:
             image_bytes = f.read()
         
-        # Удаляем временный файл
-        if os.path.exists('today_schedule.png'):
-            os.remove('today_schedule.png')
-        
-        # Обрезаем 200px снизу (940px - 200px = 740px)
-        return crop_bottom_200px(image_bytes, 740)
+        # Обрезаем лишнее снизу
+        return crop_bottom_200px(image_bytes, crop_height)
         
     except Exception as e:
-        print(f"Ошибка создания фото дня: {e}")
+        print(f"Ошибка создания фото {name}: {e}")
         return None
-
-def create_week_image() -> bytes:
-    """Создаем фото из HTML файла недели с полными стилями"""
-    if not os.path.exists(HTML_FILE):
-        return None
-    
-    try:
-        hti = Html2Image()
-        hti.output_path = '.'
-        
-        # Указываем путь к Chrome
-        chrome_paths = [
-            r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-            r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
-            r"C:\Users\{}\AppData\Local\Google\Chrome\Application\chrome.exe".format(os.getenv('USERNAME', '')),
-        ]
-        
-        for path in chrome_paths:
-            if os.path.exists(path):
-                hti.browser_executable = path
-                break
-        
-        # Читаем HTML файл
-        with open(HTML_FILE, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        # Создаем фото с увеличенным размером
-        hti.screenshot(html_str=html_content, save_as='week_schedule.png', size=(1380, 1110))
-        
-        # Читаем созданное фото
-        with open('week_schedule.png', 'rb') as f:
-            image_bytes = f.read()
-        
+    finally:
         # Удаляем временный файл
-        if os.path.exists('week_schedule.png'):
-            os.remove('week_schedule.png')
-        
-        # Обрезаем 50px снизу (970px - 50px = 920px)
-        return crop_bottom_200px(image_bytes, 920)
-        
-    except Exception as e:
-        print(f"Ошибка создания фото недели: {e}")
-        return None
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+def find_browser_executable() -> str:
+    """Ищет Chrome: CHROME_PATH, стандартные пути Windows, затем поиск html2image"""
+    chrome_paths = [
+        os.getenv('CHROME_PATH', ''),
+        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+        r"C:\Users\{}\AppData\Local\Google\Chrome\Application\chrome.exe".format(os.getenv('USERNAME', '')),
+    ]
+    for path in chrome_paths:
+        if path and os.path.exists(path):
+            return path
+    return find_chrome()
+
+class HeadlessBrowser:
+    """Один headless Chrome, управляемый по DevTools Protocol; каждая страница рендерится в своей вкладке"""
+
+    COMMAND_TIMEOUT = 30
+
+    def __init__(self) -> None:
+        self.proc: asyncio.subprocess.Process | None = None
+        self.profile_dir: tempfile.TemporaryDirectory | None = None
+        self.session: ClientSession | None = None
+        self.ws = None
+        self.reader: asyncio.Task | None = None
+        self.stderr_reader: asyncio.Task | None = None
+        self.next_id = 0
+        self.pending: dict[int, asyncio.Future] = {}
+        self.load_waiters: dict[str, asyncio.Future] = {}
+
+    async def __aenter__(self) -> HeadlessBrowser:
+        self.profile_dir = tempfile.TemporaryDirectory()
+        self.proc = await asyncio.create_subprocess_exec(
+            find_browser_executable(),
+            '--headless=new',
+            '--remote-debugging-port=0',
+            f'--user-data-dir={self.profile_dir.name}',
+            '--hide-scrollbars',
+            '--disable-gpu',
+            '--no-first-run',
+            '--no-default-browser-check',
+            'about:blank',
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            ws_url = await asyncio.wait_for(self._read_ws_url(), timeout=30)
+            # Дальше stderr просто вычитываем, чтобы Chrome не заблокировался на полном буфере
+            self.stderr_reader = asyncio.create_task(self.proc.stderr.read())
+            self.session = ClientSession()
+            self.ws = await self.session.ws_connect(ws_url, max_msg_size=0)
+            self.reader = asyncio.create_task(self._read_messages())
+        except BaseException:
+            await self.__aexit__(None, None, None)
+            raise
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        if self.ws is not None and not self.ws.closed:
+            try:
+                await asyncio.wait_for(self.send('Browser.close'), timeout=5)
+            except Exception:
+                pass
+            await self.ws.close()
+        if self.reader is not None:
+            self.reader.cancel()
+        if self.session is not None:
+            await self.session.close()
+        if self.proc is not None and self.proc.returncode is None:
+            self.proc.terminate()
+            try:
+                await asyncio.wait_for(self.proc.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                self.proc.kill()
+                await self.proc.wait()
+        if self.stderr_reader is not None:
+            self.stderr_reader.cancel()
+        if self.profile_dir is not None:
+            self.profile_dir.cleanup()
+
+    async def _read_ws_url(self) -> str:
+        while True:
+            line = await self.proc.stderr.readline()
+            if not line:
+                raise RuntimeError("Chrome завершился, не открыв DevTools")
+            match = re.search(rb'DevTools listening on (ws://\S+)', line)
+            if match:
+                return match.group(1).decode()
+
+    async def _read_messages(self) -> None:
+        try:
+            async for msg in self.ws:
+                message = json.loads(msg.data)
+                if 'id' in message:
+                    future = self.pending.pop(message['id'], None)
+                    if future is not None and not future.done():
+                        if 'error' in message:
+                            future.set_exception(RuntimeError(f"CDP: {message['error'].get('message')}"))
+                        else:
+                            future.set_result(message.get('result', {}))
+                elif message.get('method') == 'Page.loadEventFired':
+                    waiter = self.load_waiters.pop(message.get('sessionId'), None)
+                    if waiter is not None and not waiter.done():
+                        waiter.set_result(None)
+        finally:
+            # Соединение закрыто: будим всех, кто ждет ответа
+            for future in [*self.pending.values(), *self.load_waiters.values()]:
+                if not future.done():
+                    future.set_exception(RuntimeError("CDP: соединение с Chrome закрыто"))
+            self.pending.clear()
+            self.load_waiters.clear()
+
+    async def send(self, method: str, session_id: str | None = None, **params: Any) -> dict[str, Any]:
+        self.next_id += 1
+        message = {'id': self.next_id, 'method': method, 'params': params}
+        if session_id is not None:
+            message['sessionId'] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = future
+        try:
+            await self.ws.send_str(json.dumps(message))
+            # Зависшая команда не должна держать блокировки картинок бесконечно
+            return await asyncio.wait_for(future, timeout=self.COMMAND_TIMEOUT)
+        finally:
+            self.pending.pop(message['id'], None)
+
+    async def render(self, html_content: str, size: tuple[int, int]) -> bytes:
+        """Рендерит HTML в PNG размера size в новой вкладке"""
+        target_id = (await self.send('Target.createTarget', url='about:blank'))['targetId']
+        session_id = None
+        try:
+            session_id = (await self.send('Target.attachToTarget', targetId=target_id, flatten=True))['sessionId']
+            await self.send('Page.enable', session_id)
+            await self.send('Emulation.setDeviceMetricsOverride', session_id,
+                            width=size[0], height=size[1], deviceScaleFactor=1, mobile=False)
+
+            loaded = asyncio.get_running_loop().create_future()
+            self.load_waiters[session_id] = loaded
+            data_url = 'data:text/html;charset=utf-8;base64,' + base64.b64encode(html_content.encode('utf-8')).decode()
+            await self.send('Page.navigate', session_id, url=data_url)
+            await asyncio.wait_for(loaded, timeout=30)
+
+            screenshot = await self.send('Page.captureScreenshot', session_id, format='png')
+            return base64.b64decode(screenshot['data'])
+        finally:
+            if session_id is not None:
+                self.load_waiters.pop(session_id, None)
+            try:
+                await self.send('Target.closeTarget', targetId=target_id)
+            except Exception:
+                pass
+
+async def render_html_batch(documents: dict[Hashable, tuple[str, tuple[int, int]]],
+                            tabs: int = RENDER_TABS) -> dict[Hashable, bytes]:
+    """Рендерит много HTML-документов в одном браузере, по tabs вкладок параллельно.
+
+    Возвращает PNG по ключам документов; не отрисованные документы в результат не попадают.
+    """
+    if not documents:
+        return {}
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(tabs)
+    results: dict[Hashable, bytes] = {}
+
+    async with HeadlessBrowser() as browser:
+        async def render_one(key: Hashable, html_content: str, size: tuple[int, int]) -> None:
+            async with semaphore:
+                try:
+                    results[key] = await browser.render(html_content, size)
+                except Exception as e:
+                    print(f"Ошибка рендера {key}: {e}")
+
+        await asyncio.gather(*(render_one(key, *document) for key, document in documents.items()))
+
+    elapsed = time.perf_counter() - started
+    print(f"Отрендерено {len(results)}/{len(documents)} страниц за {elapsed:.2f} с "
+          f"({len(results) / elapsed:.1f} стр/с, вкладок: {tabs})")
+    return results
 
 async def send_html_file(message: types.Message) -> None:
     try:
@@ -741,6 +1251,40 @@ async def send_html_file(message: types.Message) -> None:
     except Exception as e:
         await send_or_edit_message(message.chat.id, f"❌ Произошла ошибка: {e}", get_back_keyboard())
 
+async def send_schedule_export(message: types.Message, fmt: str) -> None:
+    """Отправляет выгрузку расписания, повторно используя file_id Telegram"""
+    try:
+        model = get_schedule_model(GROUP_NAME)
+        if model is None:
+            await send_or_edit_message(message.chat.id, "❌ Расписание не загружено. Сначала выполните /update", get_back_keyboard())
+            return
+
+        key = (model['group'], model['version'], fmt)
+        _, extension, caption = EXPORT_FORMATS[fmt]
+
+        last_message = await find_last_bot_message(message.chat.id)
+        if last_message:
+            await last_message.delete()
+
+        # Если файл этой версии уже загружался в Telegram, отправляем его по file_id
+        document = export_file_ids.get(key)
+        if document is None:
+            document = types.BufferedInputFile(
+                build_export(model, fmt), filename=f"Расписание_{model['group']}.{extension}")
+
+        sent_message = await bot.send_document(
+            message.chat.id,
+            document,
+            caption=caption,
+            reply_markup=get_main_keyboard()
+        )
+        if sent_message.document:
+            export_file_ids[key] = sent_message.document.file_id
+            trim_cache(export_file_ids)
+
+    except Exception as e:
+        await send_or_edit_message(message.chat.id, f"❌ Произошла ошибка: {e}", get_back_keyboard())
+
 async def get_today_schedule(message: types.Message) -> None:
     try:
         if not os.path.exists(DAY_HTML_FILE):
@@ -750,8 +1294,8 @@ async def get_today_schedule(message: types.Message) -> None:
         # Отправляем или редактируем сообщение о создании фото
         status_message = await send_or_edit_message(message.chat.id, "⏳ Создаю фото расписания на сегодня...", get_back_keyboard())
         
-        # Создаем фото используя html2image
-        image_bytes = create_today_image()
+        # Берем фото из кэша или создаем его используя html2image
+        image_bytes = await get_schedule_image(GROUP_NAME, 'day.png')
         
         if image_bytes is None:
             await status_message.edit_text("❌ Ошибка создания фото", reply_markup=get_back_keyboard())
@@ -780,8 +1324,8 @@ async def get_week_schedule(message: types.Message) -> None:
         # Отправляем или редактируем сообщение о создании фото
         status_message = await send_or_edit_message(message.chat.id, "⏳ Создаю фото расписания на неделю...", get_back_keyboard())
         
-        # Создаем фото используя html2image
-        image_bytes = create_week_image()
+        # Берем фото из кэша или создаем его используя html2image
+        image_bytes = await get_schedule_image(GROUP_NAME, 'week.png')
         
         if image_bytes is None:
             await status_message.edit_text("❌ Ошибка создания фото", reply_markup=get_back_keyboard())
@@ -801,8 +1345,119 @@ async def get_week_schedule(message: types.Message) -> None:
     except Exception as e:
         await send_or_edit_message(message.chat.id, f"❌ Произошла ошибка: {e}", get_back_keyboard())
 
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Разрешает ли заголовок Accept-Encoding gzip с учетом q-значений (gzip;q=0 — запрет)"""
+    allowed = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        allowed[coding.strip().lower()] = q > 0
+    return allowed.get('gzip', allowed.get('x-gzip', allowed.get('*', False)))
+
+async def http_get_content(request: web.Request) -> web.Response:
+    """Отдает документ из кэша; никогда не рендерит и не скачивает на пути запроса"""
+    entry = content_cache.get((request.match_info['group'], request.match_info['name']))
+    if entry is None:
+        raise web.HTTPNotFound(text="not found: schedule is not loaded or not rendered yet")
+
+    use_gzip = entry['gzip'] is not None and accepts_gzip(request.headers.get('Accept-Encoding', ''))
+    etag = entry['gzip_etag'] if use_gzip else entry['etag']
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+
+    # If-None-Match сравнивается слабо: прокси могут пометить наш тег как W/"..."
+    if_none_match = request.headers.get('If-None-Match', '')
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    if if_none_match.strip() == '*' or etag in tags:
+        return web.Response(status=304, headers=headers)
+
+    headers['Content-Type'] = entry['content_type']
+    if use_gzip:
+        headers['Content-Encoding'] = 'gzip'
+        return web.Response(body=entry['gzip'], headers=headers)
+    return web.Response(body=entry['body'], headers=headers)
+
+async def http_metrics(request: web.Request) -> web.Response:
+    """Метрики памяти и кэшей в текстовом формате Prometheus"""
+    metrics = {
+        'isp_bot_rss_bytes': get_rss_bytes(),
+        'isp_bot_rss_peak_bytes': get_peak_rss_bytes(),
+        'isp_bot_memory_cycles_total': memory_stats['cycles'],
+        'isp_bot_content_cache_entries': len(content_cache),
+        'isp_bot_content_cache_bytes': sum(
+            len(entry['body']) + len(entry['gzip'] or b'') for entry in content_cache.values()),
+        'isp_bot_export_cache_entries': len(export_cache),
+        'isp_bot_export_cache_bytes': sum(len(data) for data in export_cache.values()),
+    }
+    if tracemalloc.is_tracing():
+        metrics['isp_bot_tracemalloc_current_bytes'], metrics['isp_bot_tracemalloc_peak_bytes'] = \
+            tracemalloc.get_traced_memory()
+    body = ''.join(f'{name} {value}\n' for name, value in metrics.items() if value is not None)
+    return web.Response(text=body, content_type='text/plain', charset='utf-8')
+
+async def http_list_sources(request: web.Request) -> web.Response:
+    """Состояние источников расписания"""
+    return web.json_response(
+        [
+            {
+                'name': source['name'],
+                'url': source['url'],
+                'groups': sorted(source_state.get(source['name'], {}).get('groups', {})),
+                **{key: str(value) if isinstance(value, datetime) else value
+                   for key, value in source_state.get(source['name'], {}).items() if key != 'groups'},
+            }
+            for source in SCHEDULE_SOURCES
+        ],
+        dumps=lambda obj: json.dumps(obj, ensure_ascii=False),
+    )
+
+async def http_list_content(request: web.Request) -> web.Response:
+    """Список доступных документов с их ETag"""
+    return web.json_response(
+        [{'group': group, 'name': name, 'etag': entry['etag']} for (group, name), entry in content_cache.items()],
+        dumps=lambda obj: json.dumps(obj, ensure_ascii=False),
+    )
+
+def create_http_app() -> web.Application:
+    """Приложение HTTP API только для чтения"""
+    app = web.Application()
+    app.router.add_get('/', http_list_content)
+    app.router.add_get('/sources', http_list_sources)
+    app.router.add_get('/metrics', http_metrics)
+    app.router.add_get('/{group}/{name}', http_get_content)
+    return app
+
+async def start_http_api() -> web.AppRunner:
+    """Запускает локальный HTTP API на HTTP_API_HOST:HTTP_API_PORT"""
+    runner = web.AppRunner(create_http_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, HTTP_API_HOST, HTTP_API_PORT).start()
+    print(f"HTTP API запущен на http://{HTTP_API_HOST}:{HTTP_API_PORT}/")
+    return runner
+
 async def main() -> None:
-    await dp.start_polling(bot)
+    check_schedule_sources()
+    if MEMORY_PROFILE:
+        tracemalloc.start(10)
+    load_content_cache()
+    # После перезапуска в кэше есть только страницы: картинки рендерим в фоне, не задерживая запуск
+    task = asyncio.create_task(warm_image_cache(GROUP_NAME))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    runner = await start_http_api() if HTTP_API_PORT else None
+    try:
+        await dp.start_polling(bot)
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        if parse_executor is not None:
+            parse_executor.shutdown()
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
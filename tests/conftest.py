@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# main создает Bot при импорте и проверяет формат токена
+os.environ.setdefault('BOT_TOKEN', '123456:TEST')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEADER = ["№", "Время", "Понедельник 20.10.2025", "Вторник 21.10.2025", "Среда 22.10.2025",
+          "Четверг 23.10.2025", "Пятница 24.10.2025", "Суббота 25.10.2025"]
+DISCIPLINE_ROW = [" ", " ", "Дисциплина, вид занятия, преподаватель", " ", " ", " ", " ", " "]
+DEFAULT_SLOTS = ['08.00-09.30', '09.40-11.10', '11.20-12.50', '13.20-14.50']
+
+
+def build_schedule_df(monday: dict[str, str], tuesday: dict[str, str] | None = None,
+                      slots: list[str] = DEFAULT_SLOTS) -> pd.DataFrame:
+    """Строки группы, как их отдает разбор файла: шапка с датами, строка "Дисциплина…" и пары по слотам"""
+    tuesday = tuesday or {}
+    rows = [HEADER, DISCIPLINE_ROW]
+    for i, slot in enumerate(slots):
+        rows.append([float(i + 1), slot, monday.get(slot, " "), tuesday.get(slot, " "), " ", " ", " ", " "])
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def make_schedule_df():
+    return build_schedule_df
@@ -0,0 +1,55 @@
+import json
+from datetime import date, datetime
+
+import pytest
+
+import main
+
+
+CELL = "Математика, лекция\nИванов И.И. аудитория 305"
+
+
+def ics_lines(model: dict) -> list[str]:
+    text = ''.join(main.iter_schedule_ics(model))
+    # Склеиваем перенесенные строки обратно
+    return text.replace('\r\n ', '').split('\r\n')
+
+
+@pytest.mark.parametrize('slot', ['08.00-09.30', '8:00 - 9:30'])
+def test_slot_parsing(make_schedule_df, slot):
+    model = main.build_schedule_model(make_schedule_df({slot: CELL}, slots=[slot]), 'ИСП-11')
+
+    assert [len(day['pairs']) for day in model['days']] == [1, 0, 0, 0, 0, 0]
+    lines = ics_lines(model)
+    assert 'DTSTART;TZID=Europe/Saratov:20251020T080000' in lines
+    assert 'DTEND;TZID=Europe/Saratov:20251020T093000' in lines
+
+
+def test_slot_bounds_edge_cases():
+    day = date(2025, 10, 20)
+
+    assert main.slot_bounds(day, '22.30-24.00') == (datetime(2025, 10, 20, 22, 30), datetime(2025, 10, 21, 0, 0))
+    assert main.slot_bounds(day, '09.30-08.00') is None
+    assert main.slot_bounds(day, 'нет времени') is None
+
+
+def test_ics_fold_cyrillic():
+    line = 'SUMMARY:' + 'Расписание занятий группы ИСП-11 ' * 5
+    folded = main._ics_fold(line)
+
+    assert folded.endswith('\r\n')
+    parts = folded[:-2].split('\r\n')
+    assert len(parts) > 1
+    assert all(len(part.encode('utf-8')) <= 75 for part in parts)
+    assert all(part.startswith(' ') for part in parts[1:])
+    assert ''.join([parts[0], *(part[1:] for part in parts[1:])]) == line
+
+
+def test_ics_escape():
+    assert main._ics_escape('Физика; практика, лаб.\nПетров\\') == r'Физика\; практика\, лаб.\nПетров\\'
+
+
+def test_schedule_json_round_trip(make_schedule_df):
+    model = main.build_schedule_model(make_schedule_df({'08.00-09.30': CELL, '09.40-11.10': CELL}), 'ИСП-11')
+
+    assert json.loads(''.join(main.iter_schedule_json(model))) == model
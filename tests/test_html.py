@@ -0,0 +1,62 @@
+import asyncio
+import os
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import main
+
+GOLDEN_DIR = Path(__file__).parent / 'golden'
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 10, 20, 7, 30, tzinfo=tz)
+
+
+TUESDAY = {slot: "Физика & <лаб.>\nПетров П.П. аудитория 210" for slot in ['08.00-09.30', '09.40-11.10']}
+
+
+FIRST_PAIR = {
+    '08.00-09.30': "Математика, лекция\nИванов И.И. аудитория 305",
+    '11.20-12.50': "Физкультура\nСидоров С.С.",
+}
+NO_FIRST_PAIR = {'09.40-11.10': "Программирование\nКузнецов К.К. аудитория 4а"}
+
+
+@pytest.fixture
+def render(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, 'datetime', FixedDatetime)
+    monkeypatch.setattr(main, 'get_smart_date_for_schedule', lambda: (date(2025, 10, 20), "сегодня"))
+    monkeypatch.setattr(main, 'content_cache', {})
+
+    def render(build, df: pd.DataFrame, output: str) -> str:
+        asyncio.run(build(df))
+        with open(output, 'r', encoding='utf-8') as f:
+            return f.read()
+    return render
+
+
+def check_golden(name: str, html_content: str) -> None:
+    path = GOLDEN_DIR / name
+    if os.getenv('UPDATE_GOLDEN') == '1':
+        path.write_text(html_content, encoding='utf-8')
+    assert html_content == path.read_text(encoding='utf-8')
+
+
+def test_week_page(render, make_schedule_df):
+    html_content = render(main.convert_to_html_and_save, make_schedule_df(FIRST_PAIR, TUESDAY), main.HTML_FILE)
+    check_golden('week.html', html_content)
+
+
+@pytest.mark.parametrize('name, monday', [
+    ('day_first_pair.html', FIRST_PAIR),
+    ('day_no_first_pair.html', NO_FIRST_PAIR),
+    ('day_no_pairs.html', {}),
+])
+def test_day_page(render, make_schedule_df, name, monday):
+    html_content = render(main.create_day_html, make_schedule_df(monday, TUESDAY), main.DAY_HTML_FILE)
+    check_golden(name, html_content)
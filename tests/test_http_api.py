@@ -0,0 +1,70 @@
+import asyncio
+import gzip
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import main
+
+BODY = '<html><body>ИСП-11</body></html>'.encode('utf-8')
+
+
+@pytest.fixture
+def request_api(monkeypatch):
+    monkeypatch.setattr(main, 'content_cache', {})
+    entry = main.store_content('ИСП-11', 'week.html', BODY)
+
+    def request_api(path: str, **headers: str):
+        async def fetch():
+            async with TestClient(TestServer(main.create_http_app())) as client:
+                response = await client.get(path, headers=headers, auto_decompress=False)
+                return response.status, response.headers, await response.read()
+
+        return asyncio.run(fetch())
+
+    return entry, request_api
+
+
+def test_identity_and_not_modified(request_api):
+    entry, request_api = request_api
+    status, headers, body = request_api('/ИСП-11/week.html', **{'Accept-Encoding': 'identity'})
+
+    assert status == 200
+    assert body == BODY
+    assert headers['ETag'] == entry['etag']
+    assert 'Content-Encoding' not in headers
+
+    status, _, body = request_api('/ИСП-11/week.html', **{'Accept-Encoding': 'identity', 'If-None-Match': entry['etag']})
+    assert status == 304
+    assert body == b''
+
+
+def test_gzip_and_weak_etag(request_api):
+    entry, request_api = request_api
+    status, headers, body = request_api('/ИСП-11/week.html', **{'Accept-Encoding': 'br, gzip;q=0.8'})
+
+    assert status == 200
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['ETag'] == entry['gzip_etag']
+    assert gzip.decompress(body) == BODY
+
+    status, _, _ = request_api('/ИСП-11/week.html', **{
+        'Accept-Encoding': 'gzip', 'If-None-Match': f'"other", W/{entry["gzip_etag"]}'})
+    assert status == 304
+
+
+@pytest.mark.parametrize('accept_encoding', ['gzip;q=0', 'identity', '*;q=0', ''])
+def test_gzip_refused(request_api, accept_encoding):
+    entry, request_api = request_api
+    status, headers, body = request_api('/ИСП-11/week.html', **{'Accept-Encoding': accept_encoding})
+
+    assert status == 200
+    assert 'Content-Encoding' not in headers
+    assert body == BODY
+
+
+def test_not_found(request_api):
+    _, request_api = request_api
+    status, _, _ = request_api('/ИСП-11/day.png')
+
+    assert status == 404
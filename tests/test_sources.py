@@ -0,0 +1,120 @@
+import asyncio
+import functools
+
+import httpx
+import pandas as pd
+import pytest
+
+import main
+
+SOURCES = [
+    {'name': "Горького, 9", 'url': 'https://college.test/gorkogo.xls'},
+    {'name': "Мичурина, 2", 'url': 'https://college.test/michurina.xls'},
+]
+WORKBOOKS = {
+    'https://college.test/gorkogo.xls': b'gorkogo',
+    'https://college.test/michurina.xls': b'michurina',
+}
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    monkeypatch.setattr(main, 'SCHEDULE_SOURCES', SOURCES)
+    monkeypatch.setattr(main, 'source_state', {})
+    monkeypatch.setattr(main, 'group_index', {})
+    monkeypatch.setattr(main, 'BOUNDED_MEMORY', False)
+    # Разбор в пуле потоков по умолчанию: тело ответа и есть имя группы
+    monkeypatch.setattr(main, 'get_parse_executor', lambda: None)
+    monkeypatch.setattr(main, 'parse_workbook', fake_parse_workbook)
+    return main.source_state
+
+
+def fake_parse_workbook(content, only=None):
+    groups = {'ИСП-11': [[content.decode()]], content.decode(): [[content.decode()]]}
+    return {name: rows for name, rows in groups.items() if only in (None, name)}
+
+
+def use_transport(monkeypatch, handler):
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(main.httpx, 'AsyncClient', functools.partial(httpx.AsyncClient, transport=transport))
+
+
+def test_parse_workbook_keeps_first_group_block(monkeypatch):
+    sheet = pd.DataFrame([
+        ["Группа - ИСП-11", None], ["первый", 1],
+        ["Группа - ИСП-12", None], ["другая", 2],
+        ["Группа - ИСП-11", None], ["повтор", 3],
+    ])
+    monkeypatch.setattr(main.pd, 'read_excel', lambda *args, **kwargs: sheet)
+
+    groups = main.parse_workbook(b'')
+
+    assert groups == {'ИСП-11': [["первый", 1]], 'ИСП-12': [["другая", 2]]}
+
+
+def test_rebuild_group_index_prefers_earlier_source(sources):
+    sources["Мичурина, 2"] = {'groups': {'ИСП-11': [['позже']], 'ИСП-21': [['только здесь']]}}
+    sources["Горького, 9"] = {'groups': {'ИСП-11': [['раньше']]}}
+
+    duplicates = main.rebuild_group_index()
+
+    assert duplicates == ["ИСП-11 (Горького, 9, Мичурина, 2)"]
+    assert main.group_index['ИСП-11'] == {'source': "Горького, 9", 'rows': [['раньше']]}
+    assert main.group_index['ИСП-21']['source'] == "Мичурина, 2"
+
+
+def test_failing_source_is_isolated(sources, monkeypatch):
+    def handler(request):
+        if 'gorkogo' in request.url.path:
+            return httpx.Response(503)
+        return httpx.Response(200, content=WORKBOOKS[str(request.url)], headers={'ETag': '"m1"'})
+
+    use_transport(monkeypatch, handler)
+
+    failed = asyncio.run(main.refresh_sources())
+
+    assert failed == ["Горького, 9"]
+    assert sources["Горького, 9"]['failures'] == 1
+    assert sources["Горького, 9"]['retry_at'] is not None
+    assert sources["Мичурина, 2"]['etag'] == '"m1"'
+    assert main.group_index['ИСП-11']['source'] == "Мичурина, 2"
+    assert 'michurina' in main.group_index
+
+
+def test_not_modified_keeps_groups(sources, monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get('If-None-Match') == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=WORKBOOKS[str(request.url)], headers={'ETag': '"v1"'})
+
+    use_transport(monkeypatch, handler)
+
+    assert asyncio.run(main.refresh_sources()) == []
+    assert asyncio.run(main.refresh_sources()) == []
+
+    assert [r.headers.get('If-None-Match') for r in requests] == [None, None, '"v1"', '"v1"']
+    assert main.group_index['ИСП-11']['rows'] == [['gorkogo']]
+
+
+def test_bounded_mode_keeps_validators_after_release(sources, monkeypatch):
+    monkeypatch.setattr(main, 'BOUNDED_MEMORY', True)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get('If-None-Match') == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=WORKBOOKS[str(request.url)], headers={'ETag': '"v1"'})
+
+    use_transport(monkeypatch, handler)
+
+    assert asyncio.run(main.refresh_sources()) == []
+    main.release_group_rows('ИСП-11')
+    assert asyncio.run(main.refresh_sources()) == []
+
+    assert [r.headers.get('If-None-Match') for r in requests[2:]] == ['"v1"', '"v1"']
+    assert 'ИСП-11' not in main.group_index
+    assert sources["Горького, 9"]['unchanged'] and sources["Горького, 9"]['rows_released']